@@ -1,5 +1,29 @@
 import { serve } from "https://deno.land/std@0.197.0/http/server.ts";
-import forge from "https://esm.sh/node-forge@1.3.1";
+import { decode as decodeBase64 } from "https://deno.land/std@0.197.0/encoding/base64.ts";
+import { indexOfNeedle } from "https://deno.land/std@0.197.0/bytes/index_of_needle.ts";
+
+// node-forge is by far the heaviest dependency; load it on the first request
+// instead of at startup so the server is listening immediately.
+let forgePromise: Promise<typeof import("https://esm.sh/node-forge@1.3.1").default> | undefined;
+
+function getForge() {
+  if (!forgePromise) {
+    forgePromise = import("https://esm.sh/node-forge@1.3.1").then((m) => m.default);
+    // Drop a failed load so the next request retries instead of caching the error.
+    forgePromise.catch(() => {
+      forgePromise = undefined;
+    });
+  }
+  return forgePromise;
+}
+
+const WHITESPACE = /\s+/g;
+const XML_OPEN = "<?xml";
+const XML_CLOSE = "</tns:auditoria>";
+
+const PEM_BEGIN = new TextEncoder().encode("-----BEGIN CMS-----");
+const PEM_END = new TextEncoder().encode("-----END CMS-----");
+const ASCII = new TextDecoder();
 
 serve(async (req) => {
   if (req.method !== "POST") {
@@ -13,27 +37,39 @@ serve(async (req) => {
     return new Response("Archivo no enviado", { status: 400 });
   }
 
-  const pem = await file.text();
+  const raw = new Uint8Array(await file.arrayBuffer());
 
   try {
-    const base64 = pem
-      .replace("-----BEGIN CMS-----", "")
-      .replace("-----END CMS-----", "")
-      .replace(/\s/g, "");
+    const forge = await getForge();
+    const begin = indexOfNeedle(raw, PEM_BEGIN);
+    const start = begin === -1 ? 0 : raw.indexOf(0x0a, begin) + 1;
+    const end = indexOfNeedle(raw, PEM_END, start);
+    const base64 = ASCII
+      .decode(raw.subarray(start, end === -1 ? raw.length : end))
+      .replace(WHITESPACE, "");
 
-    const der = forge.util.decode64(base64);
-    const asn1 = forge.asn1.fromDer(der);
+    const der = decodeBase64(base64);
+    const asn1 = forge.asn1.fromDer(forge.util.createBuffer(der));
     const p7 = forge.pkcs7.messageFromAsn1(asn1);
 
-    const content = p7.content.toString();
-    const match = content.match(/<\?xml[\s\S]*?<\/tns:auditoria>/);
+    if (!p7.content) {
+      return new Response("El CMS no contiene datos embebidos", { status: 400 });
+    }
+
+    const content = p7.content.bytes();
+    const xmlStart = content.indexOf(XML_OPEN);
+    const xmlEnd = content.indexOf(XML_CLOSE, xmlStart);
 
-    if (!match) {
+    if (xmlStart === -1 || xmlEnd === -1) {
       return new Response("No se encontró XML", { status: 400 });
     }
 
-    return new Response(match[0], {
-      headers: { "Content-Type": "application/xml" },
+    const xml = forge.util.binary.raw.decode(
+      content.slice(xmlStart, xmlEnd + XML_CLOSE.length),
+    );
+
+    return new Response(xml, {
+      headers: { "Content-Type": "application/xml; charset=utf-8" },
     });
   } catch (e) {
     return new Response("Error al procesar el archivo", { status: 500 });